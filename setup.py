@@ -1,6 +1,5 @@
 from pathlib import Path
 from setuptools import setup, find_packages
-from re import findall, M
 
 packages = ["culligan"]
 
@@ -15,9 +14,11 @@
 
 # Pull the version from __init__.py so we don't need to maintain it in multiple places
 init_txt = (HERE / "src" / packages[0] / "__init__.py").read_text("utf-8")
-try:
-    version = findall(r"^__version__ = ['\"]([^'\"]+)['\"]\r?$", init_txt, M)[0]
-except IndexError:
+for line in init_txt.splitlines():
+    if line.startswith("__version__"):
+        version = line.split("=", 1)[1].strip().strip("'\"")
+        break
+else:
     raise RuntimeError('Unable to determine version.')
 
 
@@ -1,12 +1,52 @@
 """Python API for Culligan devices"""
 
-from .uniapi_culliganiot import new_culligan_api, CulliganApi
-from .exc import (
-    CulliganError,
-    CulliganAuthExpiringError,
-    CulliganNotAuthedError,
-    CulliganAuthError,
-    CulliganReadOnlyPropertyError,
-)
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .uniapi_culliganiot import new_culligan_api, CulliganApi
+    from .exc import (
+        CulliganError,
+        CulliganAuthExpiringError,
+        CulliganNotAuthedError,
+        CulliganAuthError,
+        CulliganReadOnlyPropertyError,
+    )
+
+# Public names are resolved on first access (PEP 562) so that `import culligan`
+# does not pull in aiohttp/requests until the API is actually used
+_LAZY = {
+    "new_culligan_api":                 ("culligan.uniapi_culliganiot", "new_culligan_api"),
+    "CulliganApi":                      ("culligan.uniapi_culliganiot", "CulliganApi"),
+    "CulliganError":                    ("culligan.exc", "CulliganError"),
+    "CulliganAuthExpiringError":        ("culligan.exc", "CulliganAuthExpiringError"),
+    "CulliganNotAuthedError":           ("culligan.exc", "CulliganNotAuthedError"),
+    "CulliganAuthError":                ("culligan.exc", "CulliganAuthError"),
+    "CulliganReadOnlyPropertyError":    ("culligan.exc", "CulliganReadOnlyPropertyError"),
+}
+
+# Submodules that used to be reachable as attributes because of the eager imports
+_SUBMODULES = {"const", "culliganiot_device", "exc", "uniapi_culliganiot"}
+
+__all__ = list(_LAZY)
 
 __version__ = '1.1.3'
+
+
+def __getattr__(name: str):
+    """Import the module backing a public name (or a submodule) and cache the result"""
+    from importlib import import_module
+
+    if name in _LAZY:
+        mod_name, attr = _LAZY[name]
+        value = getattr(import_module(mod_name), attr)
+    elif name in _SUBMODULES:
+        value = import_module(f"{__name__}.{name}")
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__) | _SUBMODULES)
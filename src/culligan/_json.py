@@ -0,0 +1,11 @@
+"""JSON decoding shared by the API and device modules. Prefers the fastest installed parser."""
+
+try:
+    from orjson  import loads
+except ImportError:
+    try:
+        from ujson   import loads
+    except ImportError:
+        from json    import loads
+
+__all__ = ["loads"]
@@ -1,8 +1,13 @@
 """Class for devices handled by CulliganIoT domain"""
 
 from .const import CULLIGAN_IOT_URL
-from enum        import Enum, IntEnum, unique
-from typing      import Any, Dict, Iterable, List, Optional, Set, Union, TYPE_CHECKING
+from enum        import Enum
+from operator    import itemgetter
+from types       import MappingProxyType
+from typing      import Any, Dict, Iterable, Mapping, Optional, Tuple, Union, TYPE_CHECKING
+from urllib.parse import quote
+
+from ._json import loads
 
 if TYPE_CHECKING:
     from .uniapi_culliganiot import CulliganApi
@@ -12,9 +17,35 @@
 PropertyName  = Union[str, Enum]
 PropertyValue = Union[str, int, Enum]
 
+# Endpoint pieces shared by every device
+_COMMAND_ENDPOINT     = CULLIGAN_IOT_URL + "/device/command"
+_DATA_ENDPOINT        = CULLIGAN_IOT_URL + "/device/data"
+_DATA_ENDPOINT_PREFIX = _DATA_ENDPOINT + "?serialNumber="
+
+# Registry fields read when constructing device objects
+_DEVICE_FIELDS   = itemgetter("name", "serialNumber")
+_SOFTENER_FIELDS = itemgetter("model", "generation", "swVersion")
+
 class CulliganIoTDevice:
     """Generic device entity"""
 
+    __slots__ = (
+        "culligan_api",
+        "properties",
+        "_name",
+        "_device_serial_number",
+        "_dsn",
+        "_error",
+        "_all_properties_endpoint",
+        "_all_properties_params",
+        "_command_endpoint",
+        "__weakref__",
+    )
+
+    # Commands supported by the device, shared by every instance of the class
+    _commands: Tuple[str, ...]                  = ()
+    _command_templates: Mapping[str, Dict]      = MappingProxyType({})
+
     def __init__(self, culligan_api: "CulliganApi", device_dct: Dict):
         """
             Start object with serial = dsn. For some devices (such as SharkIQ vacuums) a device serial number is needed instead.
@@ -24,16 +55,19 @@ def __init__(self, culligan_api: "CulliganApi", device_dct: Dict):
         self.culligan_api           = culligan_api
 
         self.properties             = {}
-        self._commands              = []
 
         # Properties
-        self._name                  = device_dct['name']
-        self._device_serial_number  = device_dct["serialNumber"]
+        self._name, self._device_serial_number = _DEVICE_FIELDS(device_dct)
         
         # provide _dsn to prevent refactoring of upstream code in Culligan Integration
         self._dsn                   = self._device_serial_number
         self._error                 = None
 
+        # Per-device data URL and the equivalent query params used by update(), built once
+        self._all_properties_endpoint = _DATA_ENDPOINT_PREFIX + quote(self._device_serial_number, safe="")
+        self._all_properties_params   = {"serialNumber": self._device_serial_number}   # encoded into the query by the http client
+        self._command_endpoint        = _COMMAND_ENDPOINT
+
     @property
     def device_serial_number(self) -> Optional[str]:
         return self._device_serial_number
@@ -49,28 +83,26 @@ def name(self):
     @property
     def command_endpoint(self) -> str:
         """The endpoint which processes action commands"""
-        return f"{CULLIGAN_IOT_URL:s}/device/command"
+        return self._command_endpoint
     
-    def set_command_payload(self, command: str, active: Optional[bool], duration: Optional[int]=60) -> dict:
-        """"""
-        if command in self._commands:
-            payload = {
-                "command": command,
-                "serialNumber": self.device_serial_number,
-                "protocolVersion": 1
-            }
-
-            # only telemetry doesn't need params
-            # otherwise it needs active: 0 or active 1
-            if command != "telemetry.get":
-                payload["params"] = {
-                    "active": int(active)
-                }
-
-                if command == "bypass.timed.on":
-                    payload["params"]["duration"] = duration
-
-            return payload
+    def set_command_payload(self, command: str, active: Optional[bool], duration: Optional[int]=60) -> Optional[Dict]:
+        """Build the JSON body for a device command. Returns None for commands the device does not support."""
+        template = self._command_templates.get(command)
+        if template is None:
+            return None
+
+        payload = template.copy()
+        payload["serialNumber"] = self._device_serial_number
+
+        # only telemetry doesn't need params
+        # otherwise it needs active: 0 or active 1
+        if command != "telemetry.get":
+            params = {"active": int(active)}
+            if command == "bypass.timed.on":
+                params["duration"] = duration
+            payload["params"] = params
+
+        return payload
     
     @property
     def all_properties_endpoint(self) -> str:
@@ -78,7 +110,7 @@ def all_properties_endpoint(self) -> str:
             API endpoint to fetch updated device information
             This API retrieves all the properties for a specified device serial number (DSN).
         """
-        return f'{CULLIGAN_IOT_URL}/device/data?serialNumber={self.device_serial_number}'
+        return self._all_properties_endpoint
     
     def get_property_value(self, property_name: PropertyName) -> Any:
         """Get the value of a property from the properties dictionary"""
@@ -86,13 +118,17 @@ def get_property_value(self, property_name: PropertyName) -> Any:
             property_name = property_name.value
         return self.properties[property_name]
 
+    def fast_get(self, property_name: str) -> Any:
+        """Get the value of a property by its string name, skipping the Enum handling of get_property_value"""
+        return self.properties[property_name]
+
     def update(self, property_list: Optional[Iterable[str]] = None):
         """Update the known device state from all properties and call _do_update to add the properties to the object property dictionary.
             Culligan returns all properties with each request."""
         full_update = True # property_list is None
 
-        resp = self.culligan_api.self_request('get', self.all_properties_endpoint, params=None)
-        properties = resp.json()
+        resp = self.culligan_api.self_request('get', _DATA_ENDPOINT, params=self._all_properties_params)
+        properties = loads(resp.content)
         
         return self._do_update(full_update, properties)
 
@@ -101,8 +137,8 @@ async def async_update(self, property_list: Optional[Iterable[str]] = None):
             Culligan returns all properties with each request."""
         full_update = True # property_list is None
 
-        async with await self.culligan_api.async_request('get', self.all_properties_endpoint, params=None) as resp:
-            properties = await resp.json()
+        async with self.culligan_api.async_request('get', _DATA_ENDPOINT, params=self._all_properties_params) as resp:
+            properties = loads(await resp.read())
 
         # _do_update should not be thread blocking
         return self._do_update(full_update, properties)
@@ -114,16 +150,15 @@ def _do_update(self, full_update: bool, properties: Dict):
                 Alternatively? This could use the read_only property bool instead of 'set_'.
         """
 
-        # Update the property map so we can update by name instead of by fickle number
-        if full_update:
-            # Did a full update, so let's wipe everything
-            self.properties = {}
-
         # Culligan properties are just a simple dict, no list of dicts
         datapoints = properties["data"]["datapoints"]
 
-        for top_key in datapoints.keys():
-            self.properties[top_key] = datapoints[top_key]
+        # Update the property map so we can update by name instead of by fickle number
+        if full_update:
+            # Did a full update, so replace everything. The parsed response is not shared, so keep it as-is
+            self.properties = datapoints
+        else:
+            self.properties.update(datapoints)
 
         # the nested datapoints don't seem interesting at the moment
 
@@ -133,17 +168,33 @@ def _do_update(self, full_update: bool, properties: Dict):
 class CulliganIoTSoftener(CulliganIoTDevice):
     """ Extend device into a water softener specific device """
 
+    __slots__ = (
+        "_model",
+        "_generation",
+        "_software_version",
+        "_region",
+        "is_online",
+    )
+
+    _commands           = ("telemetry.get", "awayMode.set", "bypass.timed.on", "bypass.permanent.on", "bypass.off")
+
+    # payload skeletons for each supported command, copied and filled in by set_command_payload
+    _command_templates  = MappingProxyType({
+        command: {
+            "command": command,
+            "serialNumber": None,
+            "protocolVersion": 1
+        }
+        for command in _commands
+    })
+
     def __init__(self, culligan_api: "CulliganApi", device_dct: Dict):
         super().__init__(culligan_api, device_dct)
 
-        self._model                     = device_dct["model"]
-        self._generation                = device_dct["generation"]
-        self._software_version          = device_dct["swVersion"]
+        self._model, self._generation, self._software_version = _SOFTENER_FIELDS(device_dct)
         self._region                    = device_dct["region"]["code"]
 
-        self.is_online                  = bool(device_dct["status"]["connection"]["online"])
-
-        self._commands                  = ["telemetry.get", "awayMode.set","bypass.timed.on","bypass.permanent.on","bypass.off"]
+        self.is_online                  = device_dct["status"]["connection"]["online"]
 
     @property
     def device_model_number(self) -> Optional[str]:
@@ -161,110 +212,61 @@ def software_version(self):
     def region(self):
         return self._region
     
+    def _do_command(self, command: str, active: Optional[bool], duration: Optional[int]=60) -> bool:
+        """Send a command to the device synchronously and report whether it was accepted"""
+        resp = self.culligan_api.self_request('post', self._command_endpoint, json=self.set_command_payload(command, active, duration))
+        return loads(resp.content).get("success") is True
+
+    async def _async_do_command(self, command: str, active: Optional[bool], duration: Optional[int]=60) -> bool:
+        """Send a command to the device asynchronously and report whether it was accepted"""
+        async with self.culligan_api.async_request('post', self._command_endpoint, json=self.set_command_payload(command, active, duration)) as resp:
+            result = loads(await resp.read())
+        return result.get("success") is True
+
     def get_telemetry(self):
         """Send telemetry command"""
-        resp = self.culligan_api.self_request('post', self.command_endpoint, json=self.set_command_payload("telemetry.get", True))
-        json = resp.json()
-        if json["success"] == True:
-            return True
-        else:
-            return False
+        return self._do_command("telemetry.get", True)
         
     async def async_get_telemetry(self):
         """Send telemetry command"""
-        resp = await self.culligan_api.async_request('post', self.command_endpoint, json=self.set_command_payload("telemetry.get", True))
-        json = await resp.json()
-        if json["success"] == True:
-            return True
-        else:
-            return False
+        return await self._async_do_command("telemetry.get", True)
         
     def start_vacation_mode(self):
-        """Send telemetry command"""
-        resp = self.culligan_api.self_request('post', self.command_endpoint, json=self.set_command_payload("awayMode.set", True))
-        json = resp.json()
-        if json["success"] == True:
-            return True
-        else:
-            return False
+        """Send vacation (away) mode on command"""
+        return self._do_command("awayMode.set", True)
         
     async def async_start_vacation_mode(self):
-        """Send telemetry command"""
-        resp = await self.culligan_api.async_request('post', self.command_endpoint, json=self.set_command_payload("awayMode.set", True))
-        json = await resp.json()
-        if json["success"] == True:
-            return True
-        else:
-            return False
+        """Send vacation (away) mode on command"""
+        return await self._async_do_command("awayMode.set", True)
         
     def stop_vacation_mode(self):
-        """Send telemetry command"""
-        resp = self.culligan_api.self_request('post', self.command_endpoint, json=self.set_command_payload("awayMode.set", False))
-        json = resp.json()
-        if json["success"] == True:
-            return True
-        else:
-            return False
+        """Send vacation (away) mode off command"""
+        return self._do_command("awayMode.set", False)
         
     async def async_stop_vacation_mode(self):
-        """Send telemetry command"""
-        resp = await self.culligan_api.async_request('post', self.command_endpoint, json=self.set_command_payload("awayMode.set", False))
-        json = await resp.json()
-        if json["success"] == True:
-            return True
-        else:
-            return False
+        """Send vacation (away) mode off command"""
+        return await self._async_do_command("awayMode.set", False)
     
     def start_bypass_mode(self):
-        """Send telemetry command"""
-        resp = self.culligan_api.self_request('post', self.command_endpoint, json=self.set_command_payload("bypass.permanent.on", True))
-        json = resp.json()
-        if json["success"] == True:
-            return True
-        else:
-            return False
+        """Send permanent bypass on command"""
+        return self._do_command("bypass.permanent.on", True)
         
     async def async_start_bypass_mode(self):
-        """Send telemetry command"""
-        resp = await self.culligan_api.async_request('post', self.command_endpoint, json=self.set_command_payload("bypass.permanent.on", True))
-        json = await resp.json()
-        if json["success"] == True:
-            return True
-        else:
-            return False
+        """Send permanent bypass on command"""
+        return await self._async_do_command("bypass.permanent.on", True)
         
     def start_bypass_timed_mode(self, duration: int=60):
-        """Send telemetry command"""
-        resp = self.culligan_api.self_request('post', self.command_endpoint, json=self.set_command_payload("bypass.timed.on", True, duration))
-        json = resp.json()
-        if json["success"] == True:
-            return True
-        else:
-            return False
+        """Send timed bypass on command"""
+        return self._do_command("bypass.timed.on", True, duration)
         
     async def async_start_bypass_timed_mode(self, duration: int=60):
-        """Send telemetry command"""
-        resp = await self.culligan_api.async_request('post', self.command_endpoint, json=self.set_command_payload("bypass.permanent.on", True, duration))
-        json = await resp.json()
-        if json["success"] == True:
-            return True
-        else:
-            return False
+        """Send timed bypass on command"""
+        return await self._async_do_command("bypass.timed.on", True, duration)
         
     def stop_bypass_mode(self):
-        """Send telemetry command"""
-        resp = self.culligan_api.self_request('post', self.command_endpoint, json=self.set_command_payload("bypass.off", True))
-        json = resp.json()
-        if json["success"] == True:
-            return True
-        else:
-            return False
+        """Send bypass off command"""
+        return self._do_command("bypass.off", True)
         
     async def async_stop_bypass_mode(self):
-        """Send telemetry command"""
-        resp = await self.culligan_api.async_request('post', self.command_endpoint, json=self.set_command_payload("bypass.off", True))
-        json = await resp.json()
-        if json["success"] == True:
-            return True
-        else:
-            return False
+        """Send bypass off command"""
+        return await self._async_do_command("bypass.off", True)
@@ -1,33 +1,42 @@
 """Exceptions"""
 
+from sys import intern
+
 # Default messages
-AUTH_EXPIRED_MESSAGE = 'Ayla Networks API authentication expired.  Re-authenticate and retry.'
-AUTH_FAILURE_MESSAGE = 'Error authenticating to Ayla Networks.'
-NOT_AUTHED_MESSAGE = 'Ayla Networks API not authenticated.  Authenticate first and retry.'
+AUTH_EXPIRED_MESSAGE = intern('Ayla Networks API authentication expired.  Re-authenticate and retry.')
+AUTH_FAILURE_MESSAGE = intern('Error authenticating to Ayla Networks.')
+NOT_AUTHED_MESSAGE = intern('Ayla Networks API not authenticated.  Authenticate first and retry.')
 
 
 class CulliganError(RuntimeError):
     """Parent class for all Culligan exceptions"""
 
+    # Message used when none is given, subclasses override
+    _default_msg = None
+
+    def __init__(self, msg=None, *args):
+        if msg is None:
+            msg = self._default_msg
+        if msg is None:
+            super().__init__(*args)
+        else:
+            super().__init__(msg, *args)
+
 
 class CulliganAuthError(CulliganError):
     """Exception authenticating"""
-    def __init__(self, msg=AUTH_FAILURE_MESSAGE, *args):
-        super().__init__(msg, *args)
+    _default_msg = AUTH_FAILURE_MESSAGE
 
 
 class CulliganAuthExpiringError(CulliganError):
     """Authentication expired and needs to be refreshed"""
-    def __init__(self, msg=AUTH_EXPIRED_MESSAGE, *args):
-        super().__init__(msg, *args)
+    _default_msg = AUTH_EXPIRED_MESSAGE
 
 
 class CulliganNotAuthedError(CulliganError):
     """Shark not authorized"""
-    def __init__(self, msg=NOT_AUTHED_MESSAGE, *args):
-        super().__init__(msg, *args)
+    _default_msg = NOT_AUTHED_MESSAGE
 
 
 class CulliganReadOnlyPropertyError(CulliganError):
     """Tried to set a read-only property"""
-    pass
\ No newline at end of file
@@ -8,17 +8,16 @@
 Others such as /devices.json only seem to work when obtaining the token through Culligan.
 """
 
-from aiohttp    import ClientSession             # async http
+from aiohttp    import ClientSession, TCPConnector   # async http
+from asyncio    import Lock, gather, get_running_loop    # serialize concurrent auth calls, concurrent requests, detect blocking calls
 from ayla_iot_unofficial import AylaApi
 from .culliganiot_device import CulliganIoTDevice, CulliganIoTSoftener
 from datetime   import datetime, timedelta       # datetime operations
-from requests   import post, put, request, Response   # http request library
-from typing     import Dict, List, Optional      # object types
+from time       import monotonic                 # token deadlines, immune to wall clock changes
+from requests   import Response, Session         # http request library
+from typing     import AsyncIterator, Dict, List, Optional   # object types
 
-try:
-    from ujson   import loads
-except ImportError:
-    from json    import loads
+from ._json import loads
 
 # Defined constants
 from .const import (
@@ -35,7 +34,25 @@
     CulliganReadOnlyPropertyError,
 )
 
-_session = None
+# Device classes by registry name. Have no idea what products will be enabled or how to identify them ...
+# for now ... Smart HE and Smart Modernity are softeners. Everything else is a generic device
+_DEVICE_CLASSES = {
+    "Smart HE":         CulliganIoTSoftener,
+    "Smart Modernity":  CulliganIoTSoftener,
+}
+
+# Hints appended to the API error message for failed logins, by status code
+_AUTH_ERROR_SUFFIXES = {
+    404: " (Confirm login information is correct)",
+    401: "",
+    422: " (Confirm login information is correct, username should be an email address.)",
+}
+
+
+def _new_session() -> ClientSession:
+    """Create a ClientSession whose connector keeps connections to the Culligan host alive for reuse"""
+    return ClientSession(connector=TCPConnector(limit=20, ttl_dns_cache=300, keepalive_timeout=75))
+
 
 def new_culligan_api(username: str, password: str, app_id: str = CULLIGAN_APP_ID, websession: Optional[ClientSession] = None):
     """Get an CulliganApi object. Username is an email address."""
@@ -57,6 +74,9 @@ def __init__(
         self._culligan_access_token = None
         self._culligan_refresh_token= None
         self._culligan_expiration   = None
+        self._expired_at_mono       = None          # type: Optional[float]
+        self._expiring_at_mono      = None          # type: Optional[float]
+        self._auth_header_cache     = None          # type: Optional[Dict[str, str]]
         self._ayla_access_token     = None          # type: Optional[str]
         self._ayla_refresh_token    = None          # type: Optional[str]
         self._ayla_expiration       = None          # type: Optional[datetime]
@@ -65,29 +85,81 @@ def __init__(
         self._app_id                = app_id
         self.Ayla                   = None
         self.websession             = websession
+        self._owns_session          = False         # only close sessions we created
+        self._req_session           = None          # type: Optional[Session]
         self.v1_url                 = CULLIGAN_IOT_URL
 
+        # endpoints and the login payload do not change, so build them once
+        self._url_login             = f"{self.v1_url}/auth/login"
+        self._url_profile           = f"{self.v1_url}/user/profile"
+        self._url_metadata          = f"{self.v1_url}/metadata/user"
+        self._url_registry          = f"{self.v1_url}/device/registry"
+        self._url_device_data       = f"{self.v1_url}/device/data"
+        self._login_data            = {             # prettily formatted data for the login flow
+            "email": self._email,
+            "password": self._password,
+            "appId": self._app_id
+        }
+        self._auth_lock             = None          # type: Optional[Lock]
+        self._auth_generation       = 0             # bumped each time new credentials are stored
+
         # identify serials and dsns to track
         self.culligan_iot_serials   = []
+        self._serials_seen          = set()         # membership checks for culligan_iot_serials
         self.ayla_networks_dsns     = None
 
         # eventually combine them using Ayla 'softener' devices or other generic device class
         # ayla Softener(Device) class updates differently ... maybe extend Device here in Culligan
 
-    async def ensure_session(self) -> ClientSession:
-        """Ensure that we have an aiohttp ClientSession"""
+    def _ensure_websession(self) -> ClientSession:
+        """Create the aiohttp ClientSession if needed. Must be called with the event loop running."""
         if self.websession is None:
-            self.websession = ClientSession()
+            self.websession     = _new_session()
+            self._owns_session  = True
         return self.websession
 
-    @property
-    def _login_data(self) -> Dict[str, Dict]:
-        """Prettily formatted data for the login flow"""
-        return {
-            "email": self._email,
-            "password": self._password,
-            "appId": self._app_id
-        }
+    async def ensure_session(self) -> ClientSession:
+        """Ensure that we have an aiohttp ClientSession"""
+        return self._ensure_websession()
+
+    async def async_close(self):
+        """
+            Release all HTTP sessions: the requests Session used for synchronous calls and the aiohttp ClientSession
+            if this object created it. Sessions passed in by the caller are left open. Called by `async with api:`.
+        """
+        self.close()
+        if self._owns_session and self.websession is not None:
+            await self.websession.close()
+            self.websession     = None
+            self._owns_session  = False
+
+    def _ensure_req_session(self) -> Session:
+        """
+            Ensure that we have a requests Session for synchronous calls so connections are kept alive.
+            Synchronous calls block, so refuse to run them on a running event loop; use the async_ methods there.
+        """
+        try:
+            get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            raise CulliganError("Synchronous CulliganApi calls block the event loop. Use the async_ methods instead.")
+
+        if self._req_session is None:
+            self._req_session = Session()
+        return self._req_session
+
+    def close(self):
+        """Close the requests Session used for synchronous calls. Use this when only the synchronous API is used; async_close also calls it."""
+        if self._req_session is not None:
+            self._req_session.close()
+            self._req_session = None
+
+    async def __aenter__(self) -> "CulliganApi":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.async_close()
 
     @property
     def _sign_out_data(self) -> Dict:
@@ -104,31 +176,33 @@ def _refresh_data(self) -> Dict:
 
     def _set_credentials(self, status_code: int, login_result: Dict):
         """Update the internal credentials store. This tracks current bearer token and data needed for token refresh."""
-        if status_code   == 404:
-            raise CulliganAuthError(login_result["error"]["message"] + " (Confirm login information is correct)")
-        elif status_code == 401:
-            raise CulliganAuthError(login_result["error"]["message"])
-        elif status_code == 422:
-            raise CulliganAuthError(login_result["error"]["message"] + " (Confirm login information is correct, username should be an email address.)")
+        if status_code in _AUTH_ERROR_SUFFIXES:
+            raise CulliganAuthError(login_result["error"]["message"] + _AUTH_ERROR_SUFFIXES[status_code])
         elif "data" not in login_result:
-            raise CulliganAuthError(login_result + "Something unexpected happened and there was no 'data' in the response.")
+            raise CulliganAuthError(f"{login_result!r} Something unexpected happened and there was no 'data' in the response.")
 
-        self._culligan_username     = login_result["data"]["userId"]
-        self._culligan_access_token = login_result["data"]["accessToken"]
-        self._culligan_refresh_token= login_result["data"]["refreshToken"]
-        self._culligan_expiration   = datetime.now() + timedelta(seconds=login_result["data"]["expiresIn"])
+        data = login_result["data"]
+        self._culligan_username     = data["userId"]
+        self._culligan_access_token = data["accessToken"]
+        self._culligan_refresh_token= data["refreshToken"]
+        self._culligan_expiration   = datetime.now() + timedelta(seconds=data["expiresIn"])
+        self._expired_at_mono       = monotonic() + data["expiresIn"]
+        self._expiring_at_mono      = self._expired_at_mono - 600  # Prevent timeout immediately following
+        self._auth_header_cache     = None
 
         # Ayla tokens are not guaranteed to exist ... 
-        if "ayla" in login_result["data"]["linkedAccounts"]:
-            self._ayla_access_token     = login_result["data"]["linkedAccounts"]["ayla"]["access_token"]
-            self._ayla_refresh_token    = login_result["data"]["linkedAccounts"]["ayla"]["refresh_token"]
-            self._ayla_expiration       = datetime.now() + timedelta(seconds=login_result["data"]["linkedAccounts"]["ayla"]["expires_in"])
-            self._ayla_expiration_raw   = login_result["data"]["linkedAccounts"]["ayla"]["expires_in"]
+        ayla = data["linkedAccounts"].get("ayla")
+        if ayla is not None:
+            self._ayla_access_token     = ayla["access_token"]
+            self._ayla_refresh_token    = ayla["refresh_token"]
+            self._ayla_expiration       = datetime.now() + timedelta(seconds=ayla["expires_in"])
+            self._ayla_expiration_raw   = ayla["expires_in"]
 
         if status_code != 200:
             self._is_authed   = False
         else:
             self._is_authed   = True
+            self._auth_generation += 1
 
     def sign_in(self, returnResponse: bool = False):
         """ 
@@ -142,30 +216,55 @@ def sign_in(self, returnResponse: bool = False):
             then call AylaApi._set_credentials(200,resp["data"]["linkedAccounts"]["ayla"])
         """
         login_data = self._login_data   # get a map for JSON formatting
-        resp = post(f"{self.v1_url:s}/auth/login", json=login_data)
-        self._set_credentials(resp.status_code, resp.json())
+        resp = self._ensure_req_session().post(self._url_login, json=login_data)
+        body = loads(resp.content)
+        self._set_credentials(resp.status_code, body)
         if returnResponse:
-            return resp.json()
+            return body
 
     def refresh_auth(self):
         """Refresh the authentication synchronously using object tracked refresh token."""
         refresh_data = self._refresh_data
-        resp = put(f"{self.v1_url:s}/auth/login", json=refresh_data)
-        self._set_credentials(resp.status_code, resp.json())
+        resp = self._ensure_req_session().put(self._url_login, json=refresh_data)
+        self._set_credentials(resp.status_code, loads(resp.content))
+
+    def _get_auth_lock(self) -> Lock:
+        """Create the auth lock on first use so it binds to the running event loop"""
+        if self._auth_lock is None:
+            self._auth_lock = Lock()
+        return self._auth_lock
 
     async def async_sign_in(self):
-        """Authenticate to Culligan API asynchronously using a POST with credentials.."""
-        session = await self.ensure_session()
-        login_data = self._login_data
-        async with session.post(f"{self.v1_url:s}/auth/login", json=login_data) as resp:
-            self._set_credentials(resp.status, await resp.json())
+        """
+            Authenticate to Culligan API asynchronously using a POST with credentials..
+            Concurrent callers wait for the sign in already in flight and reuse its token.
+        """
+        lock = self._get_auth_lock()
+        generation = self._auth_generation
+        async with lock:
+            if self._auth_generation != generation:
+                # another caller stored new credentials while we waited
+                return
+            session = await self.ensure_session()
+            login_data = self._login_data
+            async with session.post(self._url_login, json=login_data) as resp:
+                self._set_credentials(resp.status, loads(await resp.read()))
 
     async def async_refresh_auth(self):
-        """Refresh the authentication asynchronously using object tracked refresh token.."""
-        session = await self.ensure_session()
-        refresh_data = self._refresh_data
-        async with session.put(f"{self.v1_url:s}/auth/login", json=refresh_data) as resp:
-            self._set_credentials(resp.status, await resp.json())
+        """
+            Refresh the authentication asynchronously using object tracked refresh token..
+            Concurrent callers wait for the refresh already in flight and reuse its token.
+        """
+        lock = self._get_auth_lock()
+        generation = self._auth_generation
+        async with lock:
+            if self._auth_generation != generation:
+                # another caller stored new credentials while we waited
+                return
+            session = await self.ensure_session()
+            refresh_data = self._refresh_data
+            async with session.put(self._url_login, json=refresh_data) as resp:
+                self._set_credentials(resp.status, loads(await resp.read()))
 
     def _clear_auth(self):
         """Clear authentication state"""
@@ -173,22 +272,24 @@ def _clear_auth(self):
         self._culligan_access_token = None
         self._culligan_refresh_token= None
         self._culligan_expiration   = None
+        self._expired_at_mono       = None
+        self._expiring_at_mono      = None
+        self._auth_header_cache     = None
         self._ayla_access_token     = None
         self._ayla_refresh_token    = None
         self._ayla_expiration       = None
-        self.websession             = None
 
     def sign_out(self):
         """Sign out and invalidate the access token synchronously"""
         """Placeholder until logout is known"""
-        #post(f"{self.v1_url:s}/auth/login", json=self._sign_out_data)
+        #post(self._url_login, json=self._sign_out_data)
         self._clear_auth()
 
     async def async_sign_out(self):
         """Sign out and invalidate the access token asynchronously"""
         """Placeholder until logout is known"""
         session = await self.ensure_session()
-        #async with session.post(f"{self.v1_url:s}/auth/login", json=self._sign_out_data) as _:
+        #async with session.post(self._url_login, json=self._sign_out_data) as _:
         #    pass
         #self._clear_auth()
 
@@ -207,27 +308,31 @@ def token_expired(self) -> bool:
         """Return true if the token has already expired"""
         if self.auth_expiration is None:
             return True
-        return datetime.now() > self.auth_expiration
+        return monotonic() > self._expired_at_mono
 
     @property
     def token_expiring_soon(self) -> bool:
         """Return true if the token will expire soon"""
         if self.auth_expiration is None:
             return True
-        return datetime.now() > self.auth_expiration - timedelta(seconds=600)  # Prevent timeout immediately following
+        return monotonic() > self._expiring_at_mono
 
     def check_auth(self, raise_expiring_soon=True):
         """Confirm authentication status"""
-        if not self._culligan_access_token or not self._is_authed or self.token_expired:
+        now = monotonic()
+        if not self._culligan_access_token or self.auth_expiration is None or now > self._expired_at_mono:
             self._is_authed = False
             raise CulliganNotAuthedError()
-        elif raise_expiring_soon and self.token_expiring_soon:
+        elif raise_expiring_soon and now > self._expiring_at_mono:
             raise CulliganAuthExpiringError()
 
     @property
     def auth_header(self) -> Dict[str, str]:
+        """Bearer header for the current token. Built once per token; treat the returned dict as read-only."""
         self.check_auth()
-        return {"Authorization": f"Bearer {self._culligan_access_token:s}"}
+        if self._auth_header_cache is None:
+            self._auth_header_cache = {"Authorization": f"Bearer {self._culligan_access_token}"}
+        return self._auth_header_cache
     
     @property
     def no_cache_header(self) -> Dict[str, str]:
@@ -237,28 +342,58 @@ def no_cache_header(self) -> Dict[str, str]:
     def _get_headers(self, fn_kwargs) -> Dict[str, str]:
         """
         Extract the headers element from fn_kwargs, removing it if it exists
-        and updating with self.auth_header.
+        and merging it with self.auth_header. Without caller headers the cached auth_header is returned as-is.
         """
-        try:
-            headers = fn_kwargs['headers']
-        except KeyError:
-            headers = {}
-        else:
-            del fn_kwargs['headers']
-        headers.update(self.auth_header)
-        return headers
+        headers = fn_kwargs.pop('headers', None)
+        if not headers:
+            return self.auth_header
+        return {**headers, **self.auth_header}
 
     def self_request(self, method: str, url: str, **kwargs) -> Response:
         """Perform an arbitrary request using the requests library synchronously"""
+        session = self._ensure_req_session()
         headers = self._get_headers(kwargs)
-        return request(method, url, headers=headers, **kwargs)
+        return session.request(method, url, headers=headers, **kwargs)
 
-    async def async_request(self, http_method: str, url: str, **kwargs):
-        """Perform an arbitrary request using the aiohttp library asynchronously"""
-        session = await self.ensure_session()
+    def async_request(self, http_method: str, url: str, **kwargs):
+        """
+            Perform an arbitrary request using the aiohttp library asynchronously.
+            Returns aiohttp's request context manager: use `async with self.async_request(...) as resp:`
+            (awaiting it directly still yields the response).
+        """
+        session = self._ensure_websession()
         headers = self._get_headers(kwargs)
         return session.request(http_method, url, headers=headers, **kwargs)
 
+    def _get_json(self, url: str, retry: bool = True, **kwargs) -> Dict:
+        """
+            GET a URL synchronously and decode the JSON body.
+            On a 401, refresh the token once and retry before raising CulliganAuthError.
+        """
+        resp = self.self_request("get", url, **kwargs)
+        response = loads(resp.content)
+        if resp.status_code == 401:
+            if retry:
+                self.refresh_auth()
+                return self._get_json(url, retry=False, **kwargs)
+            raise CulliganAuthError(response)
+        return response
+
+    async def _async_get_json(self, url: str, retry: bool = True, **kwargs) -> Dict:
+        """
+            GET a URL asynchronously and decode the JSON body.
+            On a 401, refresh the token once and retry before raising CulliganAuthError.
+        """
+        async with self.async_request("get", url, **kwargs) as resp:
+            response = loads(await resp.read())
+            status = resp.status
+        if status == 401:
+            if retry:
+                await self.async_refresh_auth()
+                return await self._async_get_json(url, retry=False, **kwargs)
+            raise CulliganAuthError(response)
+        return response
+
     def get_ayla_api(self) -> AylaApi:
         """ Get an instace of the AylaApi object and force instantiate it with auth provided by Culligan """
         AuthFromCulligan = {
@@ -277,109 +412,78 @@ def get_ayla_api(self) -> AylaApi:
 
     def get_user_profile(self) -> Dict[str, str]:
         """Get user profile synchronously"""
-        resp = self.self_request("get", f"{self.v1_url:s}/user/profile")
-        response = resp.json()
-        if resp.status_code == 401:
-            raise CulliganAuthError(response)
+        response = self._get_json(self._url_profile)
         return response
     
     async def async_get_user_profile(self) -> Dict[str, str]:
         """Get user profile async"""
-        async with await self.async_request("get", f"{self.v1_url:s}/user/profile") as resp:
-            response = await resp.json()
-            if resp.status == 401:
-                raise CulliganAuthError(response)
+        response = await self._async_get_json(self._url_profile)
         return response
     
     def get_metadata_user(self) -> Dict[str, str]:
         """Get user metadata synchronously. This is the CWS onboarding survey results (house side, what's new, interests, etc)"""
-        resp = self.self_request("get", f"{self.v1_url:s}/metadata/user")
-        response = resp.json()
-        if resp.status_code == 401:
-            raise CulliganAuthError(response)
+        response = self._get_json(self._url_metadata)
         response["data"]["CWS-onboarding-survey"] = loads(response["data"]["CWS-onboarding-survey"])
         return response
     
     async def async_get_metadata_user(self) -> Dict[str, str]:
         """Get user metadata asynchronously. This is the CWS onboarding survey results (house side, what's new, interests, etc)"""
-        async with await self.async_request("get", f"{self.v1_url:s}/metadata/user") as resp:
-            response = await resp.json()
-            if resp.status == 401:
-                raise CulliganAuthError(response)
+        response = await self._async_get_json(self._url_metadata)
         response["data"]["CWS-onboarding-survey"] = loads(response["data"]["CWS-onboarding-survey"])
         return response
     
+    def _track_serials(self, response: Dict) -> Dict:
+        """Track new serialNumbers from a device registry response for the device/data endpoint"""
+        serials = dict.fromkeys(device["serialNumber"] for device in response["data"]["devices"])
+        new_serials = [serial for serial in serials if serial not in self._serials_seen]
+        self._serials_seen.update(new_serials)
+        self.culligan_iot_serials.extend(new_serials)
+        return response
+
     def get_device_registry(self) -> Dict[str, str]:
         """Get device registry synchronously"""
         # returns data{devices[]}
         # devices has: serialNumber, name, model, generation, protocolVersion, lat, lon, swVersion, status{connection{online, lastUpdate}}, region{code}
         # metadata{}, registeredAt, createdAt, updatedAt, currentUserrole, dealerId, accountNumber, installationAddress{address, zip, city, state, country}
-        resp = self.self_request("get", f"{self.v1_url:s}/device/registry")
-        response = resp.json()
-        if resp.status_code == 401:
-            raise CulliganAuthError(response)
-        
-        # track serialNumbers for device/data endpoint
-        for device in response["data"]["devices"]:
-            if device["serialNumber"] not in self.culligan_iot_serials:
-                self.culligan_iot_serials.append(device["serialNumber"])
-
-        return response
+        return self._track_serials(self._get_json(self._url_registry))
     
     async def async_get_device_registry(self) -> Dict[str, str]:
         """Get device registry async"""
-        async with await self.async_request("get", f"{self.v1_url:s}/device/registry") as resp:
-            response = await resp.json()
-            if resp.status == 401:
-                raise CulliganAuthError(response)
-            
-        # track serialNumbers for device/data endpoint
-        for device in response["data"]["devices"]:
-            if device["serialNumber"] not in self.culligan_iot_serials:
-                self.culligan_iot_serials.append(device["serialNumber"])
-
-        return response
+        return self._track_serials(await self._async_get_json(self._url_registry))
     
+    def get_devices_raw(self) -> List[Dict]:
+        """Get the list of device dicts from the device registry, without the response envelope. Synchronous."""
+        return self.get_device_registry()["data"]["devices"]
+
+    async def async_get_devices_raw(self) -> List[Dict]:
+        """Get the list of device dicts from the device registry, without the response envelope. Asynchronous."""
+        return (await self.async_get_device_registry())["data"]["devices"]
+
     def get_devices(self) -> List[CulliganIoTDevice]:
         """Retrieve a device object of devices. Ability to update with metadata. Synchronous."""
-        devices = list()
-        device_registry = self.get_device_registry()
-        for d in device_registry["data"]["devices"]:
-            # Have no idea what products will be enabled or how to identify them ... for now ... Smart HE is a softener
-            if   d["name"] in ["Smart HE","Smart Modernity"]:
-                devices.append(CulliganIoTSoftener(self, d))
-            # Everything else is a device
-            else:
-                devices.append(CulliganIoTDevice  (self, d))
-        return devices
+        return [_DEVICE_CLASSES.get(d["name"], CulliganIoTDevice)(self, d) for d in self.get_devices_raw()]
     
     async def async_get_devices(self) -> List[CulliganIoTDevice]:
         """Retrieve a device object of devices. Ability to update with metadata. Asynchronous."""
-        devices = list()
-        device_registry = await self.async_get_device_registry()
-        for d in device_registry["data"]["devices"]:
-            # Have no idea what products will be enabled or how to identify them ... for now ... Smart HE is a softener
-            if   d["name"] in ["Smart HE","Smart Modernity"]:
-                devices.append(CulliganIoTSoftener(self, d))
-            # Everything else is a device
-            else:
-                devices.append(CulliganIoTDevice  (self, d))
-        return devices
+        return [_DEVICE_CLASSES.get(d["name"], CulliganIoTDevice)(self, d) for d in await self.async_get_devices_raw()]
+
+    async def async_iter_devices(self) -> AsyncIterator[CulliganIoTDevice]:
+        """Yield device objects one at a time, so callers looking for a single device can stop early. Asynchronous."""
+        for d in await self.async_get_devices_raw():
+            yield _DEVICE_CLASSES.get(d["name"], CulliganIoTDevice)(self, d)
 
     def get_device_data(self, serialNumber: str) -> Dict[str, str]:
         """Get device registry synchronously"""
         # most ayla properties in [data][datapoints]
-        resp = self.self_request("get", f"{self.v1_url:s}/device/data?serialNumber={serialNumber:s}")
-        response = resp.json()
-        if resp.status_code == 401:
-            raise CulliganAuthError(response)
+        response = self._get_json(self._url_device_data, params={"serialNumber": serialNumber})
         return response
     
     async def async_get_device_data(self, serialNumber: str) -> Dict[str, str]:
         """Get device registry async"""
         # most ayla properties in [data][datapoints]
-        async with await self.async_request("get", f"{self.v1_url:s}/device/data?serialNumber={serialNumber:s}") as resp:
-            response = await resp.json()
-            if resp.status == 401:
-                raise CulliganAuthError(response)
+        response = await self._async_get_json(self._url_device_data, params={"serialNumber": serialNumber})
         return response
+
+    async def async_get_all_device_data(self) -> List[Dict[str, str]]:
+        """Get device data for every tracked serial number concurrently. Results are in culligan_iot_serials order."""
+        return await gather(*(self.async_get_device_data(serial) for serial in self.culligan_iot_serials))
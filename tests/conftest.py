@@ -0,0 +1,71 @@
+"""Shared fixtures and a stubbed HTTP session for the CulliganApi and device tests"""
+
+import asyncio
+import json
+
+import pytest
+
+from culligan import CulliganApi
+from culligan.const import CULLIGAN_APP_ID
+
+LOGIN_RESULT = {
+    "data": {
+        "userId": "user",
+        "accessToken": "token",
+        "refreshToken": "refresh",
+        "expiresIn": 3600,
+        "linkedAccounts": {},
+    }
+}
+UNAUTHORIZED = {"error": {"message": "Unauthorized"}}
+
+
+class StubResponse:
+    """Minimal stand-in for both aiohttp and requests responses"""
+
+    def __init__(self, status, body):
+        self.status = self.status_code = status
+        self.content = json.dumps(body).encode()
+
+    async def read(self):
+        await asyncio.sleep(0)  # yield like a real network read
+        return self.content
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+
+class StubSession:
+    """Records requests and replays queued (status, body) responses per method and URL"""
+
+    def __init__(self):
+        self.calls = []
+        self.payloads = []
+        self.responses = {}
+
+    def queue(self, method, url, *responses):
+        self.responses.setdefault((method, url), []).extend(responses)
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url))
+        self.payloads.append(kwargs.get("json"))
+        return StubResponse(*self.responses[(method, url)].pop(0))
+
+    def put(self, url, **kwargs):
+        return self.request("put", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("post", url, **kwargs)
+
+    def count(self, method, url):
+        return self.calls.count((method, url))
+
+
+@pytest.fixture
+def api():
+    api = CulliganApi("user@example.com", "password", CULLIGAN_APP_ID, websession=StubSession())
+    api._set_credentials(200, LOGIN_RESULT)
+    return api
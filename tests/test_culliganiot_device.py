@@ -0,0 +1,82 @@
+"""Tests for CulliganIoTSoftener commands using a stubbed HTTP session"""
+
+import pytest
+
+from conftest import StubSession
+from culligan.culliganiot_device import CulliganIoTSoftener
+
+SOFTENER = {
+    "name": "Smart HE",
+    "serialNumber": "S1",
+    "model": "HE",
+    "generation": 2,
+    "swVersion": "1.0",
+    "region": {"code": "US"},
+    "status": {"connection": {"online": True}},
+}
+
+# (method name, args, command, params) for every command wrapper
+COMMANDS = [
+    ("get_telemetry",           (),     "telemetry.get",        None),
+    ("start_vacation_mode",     (),     "awayMode.set",         {"active": 1}),
+    ("stop_vacation_mode",      (),     "awayMode.set",         {"active": 0}),
+    ("start_bypass_mode",       (),     "bypass.permanent.on",  {"active": 1}),
+    ("start_bypass_timed_mode", (),     "bypass.timed.on",      {"active": 1, "duration": 60}),
+    ("start_bypass_timed_mode", (15,),  "bypass.timed.on",      {"active": 1, "duration": 15}),
+    ("stop_bypass_mode",        (),     "bypass.off",           {"active": 1}),
+]
+
+
+@pytest.fixture
+def softener(api):
+    api._req_session = StubSession()
+    return CulliganIoTSoftener(api, SOFTENER)
+
+
+def expected_payload(command, params):
+    payload = {"command": command, "serialNumber": "S1", "protocolVersion": 1}
+    if params is not None:
+        payload["params"] = params
+    return payload
+
+
+@pytest.mark.parametrize("method, args, command, params", COMMANDS)
+def test_sync_command_payload(softener, method, args, command, params):
+    session = softener.culligan_api._req_session
+    session.queue("post", softener.command_endpoint, (200, {"success": True}))
+
+    assert getattr(softener, method)(*args) is True
+    assert session.payloads == [expected_payload(command, params)]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("method, args, command, params", COMMANDS)
+async def test_async_command_payload(softener, method, args, command, params):
+    session = softener.culligan_api.websession
+    session.queue("post", softener.command_endpoint, (200, {"success": True}))
+
+    assert await getattr(softener, "async_" + method)(*args) is True
+    assert session.payloads == [expected_payload(command, params)]
+
+
+@pytest.mark.parametrize("body, expected", [
+    ({"success": True}, True),
+    ({"success": 1},    False),
+    ({},                False),
+])
+def test_sync_command_success(softener, body, expected):
+    softener.culligan_api._req_session.queue("post", softener.command_endpoint, (200, body))
+
+    assert softener.get_telemetry() is expected
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("body, expected", [
+    ({"success": True}, True),
+    ({"success": 1},    False),
+    ({},                False),
+])
+async def test_async_command_success(softener, body, expected):
+    softener.culligan_api.websession.queue("post", softener.command_endpoint, (200, body))
+
+    assert await softener.async_get_telemetry() is expected
@@ -0,0 +1,110 @@
+"""Tests for CulliganApi auth handling using a stubbed HTTP session"""
+
+import asyncio
+
+import pytest
+
+from conftest import LOGIN_RESULT, UNAUTHORIZED, StubSession
+from culligan.exc import CulliganAuthError, CulliganError
+
+@pytest.mark.asyncio
+async def test_concurrent_refresh_issues_one_put(api):
+    session = api.websession
+    session.queue("put", api._url_login, *[(200, LOGIN_RESULT)] * 5)
+
+    await asyncio.gather(*(api.async_refresh_auth() for _ in range(5)))
+
+    assert session.count("put", api._url_login) == 1
+
+
+@pytest.mark.asyncio
+async def test_401_refreshes_and_retries_once(api):
+    session = api.websession
+    profile = {"data": {"email": "user@example.com"}}
+    session.queue("get", api._url_profile, (401, UNAUTHORIZED), (200, profile))
+    session.queue("put", api._url_login, (200, LOGIN_RESULT))
+
+    assert await api.async_get_user_profile() == profile
+    assert session.count("get", api._url_profile) == 2
+    assert session.count("put", api._url_login) == 1
+
+
+@pytest.mark.asyncio
+async def test_repeated_401_raises(api):
+    session = api.websession
+    session.queue("get", api._url_profile, (401, UNAUTHORIZED), (401, UNAUTHORIZED))
+    session.queue("put", api._url_login, (200, LOGIN_RESULT))
+
+    with pytest.raises(CulliganAuthError):
+        await api.async_get_user_profile()
+    assert session.count("get", api._url_profile) == 2
+
+
+def test_sync_401_refreshes_and_retries_once(api):
+    session = api._req_session = StubSession()
+    profile = {"data": {"email": "user@example.com"}}
+    session.queue("get", api._url_profile, (401, UNAUTHORIZED), (200, profile))
+    session.queue("put", api._url_login, (200, LOGIN_RESULT))
+
+    assert api.get_user_profile() == profile
+    assert session.count("get", api._url_profile) == 2
+
+
+@pytest.mark.asyncio
+async def test_sync_call_inside_running_loop_raises(api):
+    api._req_session = StubSession()
+
+    with pytest.raises(CulliganError):
+        api.get_user_profile()
+    assert api._req_session.calls == []
+
+
+@pytest.mark.asyncio
+async def test_async_with_leaves_caller_session_open(api):
+    session = api.websession
+
+    async with api:
+        pass
+
+    assert api.websession is session
+
+
+def test_set_credentials_without_data_raises_auth_error(api):
+    with pytest.raises(CulliganAuthError):
+        api._set_credentials(200, {})
+
+
+def test_set_credentials_422_adds_email_hint(api):
+    with pytest.raises(CulliganAuthError) as err:
+        api._set_credentials(422, {"error": {"message": "Invalid"}})
+    assert str(err.value).endswith("username should be an email address.)")
+
+
+class ClosableStubSession(StubSession):
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.mark.asyncio
+async def test_async_with_closes_requests_session(api):
+    req_session = api._req_session = ClosableStubSession()
+
+    async with api:
+        pass
+
+    assert req_session.closed
+    assert api._req_session is None
+
+
+@pytest.mark.asyncio
+async def test_concurrent_refresh_of_short_lived_token_issues_one_put(api):
+    # a token inside the expiring-soon window must not make waiters refresh again
+    short_lived = {"data": {**LOGIN_RESULT["data"], "expiresIn": 300}}
+    session = api.websession
+    session.queue("put", api._url_login, *[(200, short_lived)] * 5)
+
+    await asyncio.gather(*(api.async_refresh_auth() for _ in range(5)))
+
+    assert session.count("put", api._url_login) == 1